@@ -5,6 +5,26 @@ import matplotlib.pyplot as plt
 import numpy as np
 import sys
 
+try:
+    from numba import njit
+except ImportError:  # numba is optional; rolling_median falls back to pandas
+    njit = None
+
+ROLLING_WINDOW = 10
+
+# Column types for the CSVs written by dos_simulator.py / normalize_results.py. Only
+# columns present in a given file are passed on, since normalized CAN runs have a different layout.
+SYSTEM_DTYPES = {"cpu_percent": "float32", "mem_used": "int64", "mem_percent": "float32",
+                 "tcp_conn_count_to_target": "int32", "proc_num_fds": "Int32"}
+REQUEST_DTYPES = {"idx": "int32", "success": "bool", "latency_ms": "float32",
+                  "resp_len": "Int32"}  # nullable: CAN runs leave resp_len empty
+
+# Only what plot_timeseries draws is loaded: an x column plus CPU% / latency.
+# This skips the *_json and err string columns, which dominate file size on large runs.
+TIME_COLUMNS = ["timestamp", "time", "frame_id"]
+SYSTEM_COLUMNS = TIME_COLUMNS + ["cpu_percent"]
+REQUEST_COLUMNS = TIME_COLUMNS + ["latency_ms"]
+
 def load_run(folder):
     summary_path = os.path.join(folder, "summary.json")
     if not os.path.exists(summary_path):
@@ -13,12 +33,33 @@ def load_run(folder):
         summary = json.load(f)
     summary_flat = {k: v for k, v in summary.items() if not isinstance(v, dict)}
 
-    system_csv = os.path.join(folder, "system.csv")
-    requests_csv = os.path.join(folder, "requests.csv")
-    sys_df = pd.read_csv(system_csv) if os.path.exists(system_csv) else None
-    req_df = pd.read_csv(requests_csv) if os.path.exists(requests_csv) else None
+    sys_df = read_run_table(folder, "system", SYSTEM_DTYPES, SYSTEM_COLUMNS)
+    req_df = read_run_table(folder, "requests", REQUEST_DTYPES, REQUEST_COLUMNS)
     return summary_flat, sys_df, req_df
 
+def read_run_table(folder, name, dtypes, columns):
+    """Prefer <name>.parquet (already typed, no text parsing) when present and pyarrow is installed, else <name>.csv."""
+    parquet_path = os.path.join(folder, name + ".parquet")
+    if os.path.exists(parquet_path):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            pq = None
+        if pq is not None:
+            names = pq.read_schema(parquet_path).names
+            return pd.read_parquet(parquet_path, columns=[c for c in columns if c in names] or None)
+    return read_typed_csv(os.path.join(folder, name + ".csv"), dtypes, columns)
+
+def read_typed_csv(path, dtypes, columns):
+    """read_csv of just `columns` with declared types (skips inference); None if the file is missing.
+    Falls back to the whole file if none of `columns` exist in it."""
+    if not os.path.exists(path):
+        return None
+    header = pd.read_csv(path, nrows=0).columns
+    usecols = [c for c in columns if c in header] or None
+    keep = usecols if usecols else header
+    return pd.read_csv(path, usecols=usecols, dtype={c: t for c, t in dtypes.items() if c in keep})
+
 def safe_num(x):
     try:
         if x is None or (isinstance(x, float) and np.isnan(x)):
@@ -47,13 +88,74 @@ def plot_bars(summaryA, summaryB, labelA, labelB):
     plt.savefig("compare_bars.png", dpi=150)
     print("[DONE] Saved compare_bars.png")
 
+def _rolling_median_kernel(a, w):
+    """Keeps the current window in a sorted buffer: each step removes the value
+    leaving the window and insertion-sorts the new one (O(w) per step)."""
+    n = a.size
+    out = np.full(n, np.nan)
+    buf = np.empty(w)
+    k = 0      # values currently in buf
+    nans = 0   # NaNs in the window; stored as +inf so the buffer stays ordered
+    for i in range(n):
+        x = a[i]
+        if np.isnan(x):
+            nans += 1
+            x = np.inf
+        if i >= w:
+            old = a[i - w]
+            if np.isnan(old):
+                nans -= 1
+                old = np.inf
+            j = 0
+            while buf[j] != old:
+                j += 1
+            while j < w - 1:
+                buf[j] = buf[j + 1]
+                j += 1
+            k = w - 1
+        j = k
+        while j > 0 and buf[j - 1] > x:
+            buf[j] = buf[j - 1]
+            j -= 1
+        buf[j] = x
+        k += 1
+        if k == w and nans == 0:
+            if w % 2:
+                out[i] = buf[w // 2]
+            else:
+                out[i] = 0.5 * (buf[w // 2 - 1] + buf[w // 2])
+    return out
+
+if njit is not None:
+    _rolling_median_kernel = njit(cache=True)(_rolling_median_kernel)
+
+def rolling_median(values, w=ROLLING_WINDOW):
+    """Same result as Series.rolling(w).median(): NaN until the window is full or while it holds a NaN."""
+    a = np.asarray(values, dtype=np.float64)
+    if njit is None:
+        return pd.Series(a).rolling(w).median().to_numpy()
+    return _rolling_median_kernel(a, w)
+
+def smoothed_latency(values, eps=1e-6):
+    """Latency curve for plotting: rolling median, or the raw values if the series is flat
+    (peak-to-peak < eps ms), where the median would just reproduce them."""
+    a = np.asarray(values, dtype=np.float64)
+    if a.size and np.ptp(a) < eps:
+        return a
+    return rolling_median(a)
+
 def get_time_column(df):
     """Return the best available time-like column name or None."""
-    for c in ["timestamp", "time", "frame_id"]:
+    for c in TIME_COLUMNS:
         if c in df.columns:
             return c
     return None
 
+def get_best_x(df):
+    """x values for a time-series plot: the best time-like column, else the row index."""
+    c = get_time_column(df)
+    return df[c].to_numpy() if c is not None else np.arange(len(df))
+
 def plot_timeseries(sysA, sysB, reqA, reqB, labelA, labelB):
     if sysA is None or sysB is None:
         print("---->Skipping time-series plot (missing system.csv)")
@@ -62,27 +164,21 @@ def plot_timeseries(sysA, sysB, reqA, reqB, labelA, labelB):
     fig, ax1 = plt.subplots(figsize=(10, 4))
     ax2 = ax1.twinx()
 
-    def get_best_x(df):
-        for c in ["timestamp", "time", "frame_id"]:
-            if c in df.columns:
-                return df[c]
-        return pd.Series(range(len(df)))  # fallback to index
-
     timeA = get_best_x(sysA)
     timeB = get_best_x(sysB)
 
     # Plot CPU
-    ax1.plot(timeA, sysA.get("cpu_percent", pd.Series([0]*len(sysA))),
+    ax1.plot(timeA, sysA["cpu_percent"] if "cpu_percent" in sysA.columns else np.zeros(len(sysA)),
              label=f"{labelA} CPU%", color="tab:blue", alpha=0.6)
-    ax1.plot(timeB, sysB.get("cpu_percent", pd.Series([0]*len(sysB))),
+    ax1.plot(timeB, sysB["cpu_percent"] if "cpu_percent" in sysB.columns else np.zeros(len(sysB)),
              label=f"{labelB} CPU%", color="tab:green", alpha=0.6)
 
     # Plot latency if available
     if reqA is not None and "latency_ms" in reqA.columns:
-        ax2.plot(get_best_x(reqA), reqA["latency_ms"].rolling(10).median(),
+        ax2.plot(get_best_x(reqA), smoothed_latency(reqA["latency_ms"]),
                  label=f"{labelA} Lat(ms)", color="tab:red")
     if reqB is not None and "latency_ms" in reqB.columns:
-        ax2.plot(get_best_x(reqB), reqB["latency_ms"].rolling(10).median(),
+        ax2.plot(get_best_x(reqB), smoothed_latency(reqB["latency_ms"]),
                  label=f"{labelB} Lat(ms)", color="tab:orange")
 
     ax1.set_xlabel("Frame / Time / Index")
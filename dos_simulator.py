@@ -6,19 +6,25 @@ python3 dos_simulator.py --port 65432 --mode churn --concurrency 200 --total 200
 
 import argparse
 import asyncio
-import csv
+import base64
 import json
+import math
 import os
 import sys
 import time
+from collections import Counter
 from datetime import datetime
-from statistics import mean
 from typing import Optional
 
 import numpy as np
 import psutil
 import pandas as pd
 
+try:
+    import orjson
+except ImportError:  # optional, faster summary.json encoding
+    orjson = None
+
 
 # ------------------------
 # Helpers
@@ -28,21 +34,63 @@ import pandas as pd
 def iso_now():
     return datetime.utcnow().isoformat() + "Z"
 
+# requests.csv timestamp format; always prints microseconds so streamed and batch-written files match
+ISO_FMT = "%Y-%m-%dT%H:%M:%S.%fZ"
+
+def iso_from_epoch(epoch):
+    return datetime.utcfromtimestamp(epoch).strftime(ISO_FMT)
+
+def iso_from_epochs(epochs):
+    """Vectorized iso_from_epoch for a float64 array of epoch seconds (same rounding to microseconds)."""
+    frac, whole = np.modf(epochs)  # utcfromtimestamp rounds the fractional part to the nearest microsecond
+    us = whole.astype(np.int64) * 1_000_000 + np.round(frac * 1e6).astype(np.int64)
+    return pd.to_datetime(us, unit="us", utc=True).strftime(ISO_FMT)
+
+def csv_field(value):
+    """Render one CSV cell the way csv.writer (QUOTE_MINIMAL) would; None -> empty."""
+    if value is None:
+        return ""
+    value = str(value)
+    if any(ch in value for ch in ',"\r\n'):
+        return '"' + value.replace('"', '""') + '"'
+    return value
+
 def safe_mkdir(d):
     os.makedirs(d, exist_ok=True)
     
-'''recursively converts bytes into base64-encoded strings so JSON dumps won't fail. Also recurses for dict/list.'''
-def clean_for_json(obj):
-    """Convert bytes -> base64 strings for safe JSON dump"""
-    import base64
+def json_default(obj):
+    """Fallback for values the JSON encoders can't handle: bytes -> base64, numpy scalars -> Python."""
     if isinstance(obj, bytes):
         return base64.b64encode(obj).decode("ascii")
-    elif isinstance(obj, dict):
-        return {k: clean_for_json(v) for k, v in obj.items()}
-    elif isinstance(obj, list):
-        return [clean_for_json(x) for x in obj]
-    else:
-        return obj
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def nan_to_null(obj):
+    """Copy of obj with NaN/inf floats (incl. numpy floats) replaced by None, as orjson writes them (null)."""
+    if isinstance(obj, dict):
+        return {k: nan_to_null(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [nan_to_null(v) for v in obj]
+    if isinstance(obj, (float, np.floating)):
+        return obj if math.isfinite(obj) else None
+    return obj
+
+def dumps_json(obj):
+    """Indented JSON as UTF-8 bytes; uses orjson when installed, the stdlib encoder otherwise.
+
+    Both give the same JSON values (NaN/inf -> null, non-ASCII as raw UTF-8), but not always the same bytes:
+    orjson spells some floats differently (1e-05 -> 0.00001, 1.5e+20 -> 1.5e20, float32 at float32 precision).
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY, default=json_default)
+    # ensure_ascii=False: non-ASCII as raw UTF-8 like orjson, not \uXXXX escapes
+    return json.dumps(nan_to_null(obj), indent=2, ensure_ascii=False, default=json_default).encode("utf-8")
+
+
+REQUEST_KEYS = ["idx","ts","success","latency_ms","resp_len","err","iteration"]
+STREAM_QUEUE_SIZE = 65536   # rows buffered between load coroutines and the requests.csv writer
+STREAM_FLUSH_ROWS = 4096
 
 
 # --------------------------------------------------------------------------
@@ -70,30 +118,39 @@ class SystemSampler:
             cpu = psutil.cpu_percent(interval=None) #instantaneous CPU percent since last call
             vm = psutil.virtual_memory()
             swap = psutil.swap_memory()
-            tcp_count = 0 #Count TCP connections to target_port
-            states = {} #dictionary of TCP connections states count
-            '''Iterates all TCP connections on the machine and counts those where local or remote port matches target_port. Collects counts per TCP state (e.g., ESTABLISHED, TIME_WAIT).'''
-            try:
-                for c in psutil.net_connections(kind='tcp'):
-                    if self.target_port:
-                        if (c.laddr and c.laddr.port == self.target_port) or (c.raddr and c.raddr.port == self.target_port):
-                            tcp_count += 1
-                            states[c.status] = states.get(c.status, 0) + 1
-            except Exception:
-                pass
-	    '''If a psutil.Process is available, sample its CPU percent and memory info; attempt to read number of file descriptors'''
+            conns = None
+            '''If a psutil.Process is available, sample its CPU percent and memory info; attempt to read number of file descriptors.
+            Its TCP sockets are listed here too, so the connection scan below only walks the server's sockets.'''
             proc_cpu = proc_mem = fds = None
             if proc:
                 try:
-                    proc_cpu = proc.cpu_percent(interval=None)
-                    meminfo = proc.memory_info()
-                    proc_mem = {"rss": meminfo.rss, "vms": meminfo.vms}
-                    try:
-                        fds = proc.num_fds()
-                    except Exception:
-                        fds = None
+                    with proc.oneshot():  # one procfs read shared by the calls below
+                        proc_cpu = proc.cpu_percent(interval=None)
+                        meminfo = proc.memory_info()
+                        proc_mem = {"rss": meminfo.rss, "vms": meminfo.vms}
+                        try:
+                            fds = proc.num_fds()
+                        except Exception:
+                            fds = None
+                        try:
+                            conns = proc.net_connections(kind='tcp')
+                        except Exception:
+                            conns = None
                 except Exception:
                     pass
+            '''Counts TCP connections where local or remote port matches target_port, per TCP state (e.g., ESTABLISHED, TIME_WAIT).
+            Falls back to scanning every TCP connection on the machine when no server process is available.'''
+            if conns is None:
+                try:
+                    conns = psutil.net_connections(kind='tcp')
+                except Exception:
+                    conns = []
+            states = Counter() #TCP connection state -> count
+            if self.target_port:
+                port = self.target_port
+                states.update(c.status for c in conns
+                              if (c.laddr and c.laddr.port == port) or (c.raddr and c.raddr.port == port))
+            tcp_count = sum(states.values()) #Count TCP connections to target_port
 
             row = {
                 "ts": iso_now(),
@@ -105,9 +162,9 @@ class SystemSampler:
                 "mem_percent": vm.percent,
                 "swap_percent": swap.percent,
                 "tcp_conn_count_to_target": tcp_count,
-                "tcp_states_json": json.dumps(states),
+                "tcp_states_json": states,   # kept as dicts; JSON-encoded once in write_csv_system
                 "proc_cpu_percent": proc_cpu,
-                "proc_mem_json": json.dumps(proc_mem) if proc_mem else None,
+                "proc_mem_json": proc_mem,
                 "proc_num_fds": fds,
             }
             self.rows.append(row)
@@ -124,7 +181,7 @@ class SystemSampler:
 #Long - hold persistent connections and send repeatedly
 # ---------------------------------------------------------
 class LoadGen:
-    def __init__(self, host, port, concurrency, total, mode="churn", payload=b"ping", timeout=5.0):
+    def __init__(self, host, port, concurrency, total, mode="churn", payload=b"ping", timeout=5.0, stream_path=None):
         self.host = host
         self.port = port
         self.concurrency = concurrency
@@ -132,47 +189,114 @@ class LoadGen:
         self.mode = mode
         self.payload = payload
         self.timeout = timeout
-        self.results = []
-        self._sem = asyncio.Semaphore(concurrency)
+        # When stream_path is set, rows are appended to that CSV as they complete and only the
+        # numeric columns (needed by summarize) are kept in memory.
+        self.stream_path = stream_path
+        self._queue = None
+        # Results are kept column-wise (one preallocated array per field) instead of one dict per request.
+        # Slots are handed out in completion order; capacity doubles if a mode outruns the initial estimate.
+        self.count = 0
+        self._alloc(max(total, concurrency, 1))
         self._stop = False
-   '''Single request coroutine. uses self._sem to limit concurrent tasks. opens an async TCP connection with async.open_connection. Sends payload +and waits for a line in response.'''
+
+    def _alloc(self, n):
+        self.idx = np.empty(n, np.int32)
+        self.iteration = np.full(n, -1, np.int32)   # -1 = not a persistent-connection request
+        self.success = np.zeros(n, np.bool_)
+        self.lat_ns = np.empty(n, np.int64)       # raw perf_counter_ns deltas; converted to ms in columns()
+        self.resp_len = np.empty(n, np.int32)
+        self.ts_epoch = np.empty(n, np.float64)   # time.time(); formatted to ISO only when written
+        m = 0 if self.stream_path else n
+        self.err = [None] * m
+
+    def _grow(self):
+        n = len(self.idx)
+        self.idx = np.concatenate([self.idx, np.empty(n, np.int32)])
+        self.iteration = np.concatenate([self.iteration, np.full(n, -1, np.int32)])
+        self.success = np.concatenate([self.success, np.zeros(n, np.bool_)])
+        self.lat_ns = np.concatenate([self.lat_ns, np.empty(n, np.int64)])
+        self.resp_len = np.concatenate([self.resp_len, np.empty(n, np.int32)])
+        self.ts_epoch = np.concatenate([self.ts_epoch, np.empty(n, np.float64)])
+        m = len(self.err)
+        self.err.extend([None] * m)
+
+    async def _record(self, idx, success, lat_ns, resp_len, err=None, iteration=-1):
+        i = self.count
+        if i == len(self.idx):
+            self._grow()
+        self.idx[i] = idx
+        self.iteration[i] = iteration
+        self.success[i] = success
+        self.lat_ns[i] = lat_ns
+        self.resp_len[i] = resp_len
+        ts = self.ts_epoch[i] = time.time()
+        self.count = i + 1
+        if self._queue is not None:
+            # blocks only when the writer falls STREAM_QUEUE_SIZE rows behind
+            await self._queue.put((idx, ts, success, lat_ns, resp_len, err, iteration if iteration >= 0 else None))
+        else:
+            self.err[i] = err
+
+    async def _stream_writer(self):
+        '''Drains the result queue into stream_path, flushing every STREAM_FLUSH_ROWS rows.'''
+        # Each row is formatted as one bytes line into a 1 MiB BufferedWriter; only err can need CSV quoting.
+        with open(self.stream_path, "wb", buffering=1 << 20) as f:
+            f.write((",".join(REQUEST_KEYS) + "\n").encode())
+            n = 0
+            while True:
+                row = await self._queue.get()
+                if row is None:
+                    break
+                idx, ts, success, lat_ns, resp_len, err, it = row
+                f.write(f"{idx},{iso_from_epoch(ts)},{success},{lat_ns / 1e6},{resp_len},"
+                        f"{csv_field(err)},{'' if it is None else it}\n".encode())
+                n += 1
+                if n % STREAM_FLUSH_ROWS == 0:
+                    f.flush()
+
+    def columns(self):
+        """Recorded results as {column: array}, trimmed to the filled slots. "ts" is epoch seconds."""
+        n = self.count
+        return {
+            "idx": self.idx[:n], "ts": self.ts_epoch[:n], "success": self.success[:n],
+            "latency_ms": self.lat_ns[:n] / 1e6, "resp_len": self.resp_len[:n],  # ms: same conversion as the stream writer
+            "err": self.err[:n], "iteration": self.iteration[:n],
+        }
+    '''Single request coroutine. Concurrency is bounded by the caller (run_churn workers / run_steady batches). opens an async TCP connection with async.open_connection. Sends payload +and waits for a line in response.'''
     async def _one(self, idx):
-        async with self._sem:
-            start = time.perf_counter()
+        start = time.perf_counter_ns()
+        try:
+            reader, writer = await asyncio.wait_for(asyncio.open_connection(self.host, self.port), timeout=self.timeout)
+            writer.write(self.payload + b"\n")
+            await writer.drain()
             try:
-                reader, writer = await asyncio.wait_for(asyncio.open_connection(self.host, self.port), timeout=self.timeout)
-                writer.write(self.payload + b"\n")
-                await writer.drain()
-                try:
-                    data = await asyncio.wait_for(reader.readline(), timeout=self.timeout) # Measures latency
-                except asyncio.TimeoutError:
-                    data = b""
-                end = time.perf_counter()
-                try:
-                    writer.close()
-                    await writer.wait_closed()
-                except Exception:
-                    pass
-                # On success, appends a result entry with success=True, latency_ms, response length, etc.
-                self.results.append({
-                    "idx": idx, "ts": iso_now(), "success": True,
-                    "latency_ms": (end - start) * 1000.0, "resp_len": len(data), "err": None
-                })
-            except Exception as e:
-                end = time.perf_counter()
-                self.results.append({
-                    "idx": idx, "ts": iso_now(), "success": False,
-                    "latency_ms": (end - start) * 1000.0, "resp_len": 0, "err": str(e)
-                })
-   '''schedules total concurrent tasks (bounded by semaphore) and awaits them. This results in many short-lived connections.'''
+                data = await asyncio.wait_for(reader.readline(), timeout=self.timeout) # Measures latency
+            except asyncio.TimeoutError:
+                data = b""
+            end = time.perf_counter_ns()
+            try:
+                writer.close()
+                await writer.wait_closed()
+            except Exception:
+                pass
+            # On success, records a result with success=True, latency_ms, response length, etc.
+            await self._record(idx, True, end - start, len(data))
+        except Exception as e:
+            end = time.perf_counter_ns()
+            await self._record(idx, False, end - start, 0, str(e))
+    '''runs `concurrency` long-lived workers that pull request indices from a shared iterator until total is reached. This results in many short-lived connections.'''
     async def run_churn(self):
-        tasks = []
-        for i in range(self.total):
-            if self._stop:
-                break
-            tasks.append(asyncio.create_task(self._one(i)))
-        if tasks:
-            await asyncio.gather(*tasks, return_exceptions=True)
+        next_idx = iter(range(self.total))  # shared by all workers; safe on a single event loop
+
+        async def worker():
+            for i in next_idx:
+                if self._stop:
+                    break
+                await self._one(i)
+
+        workers = min(self.concurrency, self.total)
+        if workers > 0:
+            await asyncio.gather(*(worker() for _ in range(workers)), return_exceptions=True)
     
     '''repeatedly launches concurrency tasks per iteration, waits for them to finish, then sleeps a short interval. Produces steady periodic bursts.'''
     async def run_steady(self, iterations=100):
@@ -194,7 +318,7 @@ class LoadGen:
                 r, w = await asyncio.open_connection(self.host, self.port)
                 readers.append(r); writers.append(w)
             except Exception as e:
-                self.results.append({"idx": i, "ts": iso_now(), "success": False, "latency_ms": 0, "resp_len": 0, "err": str(e)})
+                await self._record(i, False, 0, 0, str(e))
         start = time.perf_counter()
         iter_no = 0
         while (time.perf_counter() - start) < hold_time and not self._stop:
@@ -207,10 +331,10 @@ class LoadGen:
         for w in writers:
             try: w.close()
             except: pass
-	
-   '''Helper for persistent connections: send payload, optionally read response line, record metrics per iteration.'''	
+
+    '''Helper for persistent connections: send payload, optionally read response line, record metrics per iteration.'''
     async def _send_persistent(self, idx, reader, writer, iteration):
-        start = time.perf_counter()
+        start = time.perf_counter_ns()
         try:
             writer.write(self.payload + b"\n")
             await writer.drain()
@@ -218,27 +342,30 @@ class LoadGen:
                 data = await asyncio.wait_for(reader.readline(), timeout=self.timeout)
             except asyncio.TimeoutError:
                 data = b""
-            end = time.perf_counter()
-            self.results.append({
-                "idx": idx, "iteration": iteration, "ts": iso_now(),
-                "success": True, "latency_ms": (end - start)*1000.0, "resp_len": len(data), "err": None
-            })
+            end = time.perf_counter_ns()
+            await self._record(idx, True, end - start, len(data), iteration=iteration)
         except Exception as e:
-            end = time.perf_counter()
-            self.results.append({
-                "idx": idx, "iteration": iteration, "ts": iso_now(),
-                "success": False, "latency_ms": (end - start)*1000.0, "resp_len": 0, "err": str(e)
-            })
+            end = time.perf_counter_ns()
+            await self._record(idx, False, end - start, 0, str(e), iteration=iteration)
 
     async def run(self):
-        if self.mode == "churn":
-            await self.run_churn()
-        elif self.mode == "steady":
-            await self.run_steady()
-        elif self.mode == "long":
-            await self.run_long()
-        else:
-            raise ValueError("Unknown mode")
+        writer_task = None
+        if self.stream_path:
+            self._queue = asyncio.Queue(maxsize=STREAM_QUEUE_SIZE)
+            writer_task = asyncio.create_task(self._stream_writer())
+        try:
+            if self.mode == "churn":
+                await self.run_churn()
+            elif self.mode == "steady":
+                await self.run_steady()
+            elif self.mode == "long":
+                await self.run_long()
+            else:
+                raise ValueError("Unknown mode")
+        finally:
+            if writer_task:
+                await self._queue.put(None)
+                await writer_task
 
     def stop(self):
         self._stop = True
@@ -248,39 +375,93 @@ class LoadGen:
 # Reporting helpers
 # ------------------------
 def summarize(results):
-    lat = [r["latency_ms"] for r in results if r["success"] and r.get("latency_ms") is not None]
-    total = len(results)
-    succ = sum(1 for r in results if r["success"])
+    """results: column dict from LoadGen.columns()"""
+    success = results["success"]
+    # boolean mask over the latency column -> one partition pass for all three percentiles
+    lat = results["latency_ms"][success]
+    total = len(success)
+    succ = int(np.count_nonzero(success))
     fail = total - succ
+    p50 = p90 = p99 = lat_mean = None
+    if lat.size:
+        p50, p90, p99 = (float(v) for v in np.percentile(lat, [50, 90, 99]))
+        lat_mean = float(lat.mean())
     return {
         "total": total,
         "successes": succ,
         "failures": fail,
         "success_rate_pct": (succ / total * 100.0) if total > 0 else None,
-        "lat_p50_ms": float(np.percentile(lat, 50)) if lat else None,
-        "lat_p90_ms": float(np.percentile(lat, 90)) if lat else None,
-        "lat_p99_ms": float(np.percentile(lat, 99)) if lat else None,
-        "lat_mean_ms": float(mean(lat)) if lat else None
+        "lat_p50_ms": p50,
+        "lat_p90_ms": p90,
+        "lat_p99_ms": p99,
+        "lat_mean_ms": lat_mean
     }
 
 def write_csv_requests(path, results):
-    keys = ["idx","ts","success","latency_ms","resp_len","err","iteration"]
-    with open(path,"w",newline="") as f:
-        w = csv.DictWriter(f, fieldnames=keys)
-        w.writeheader()
-        for r in results:
-            row = {k: r.get(k) for k in keys}
-            w.writerow(row)
+    keys = REQUEST_KEYS
+    # columns go straight from the arrays into pandas' C writer; no per-row Python objects
+    cols = {k: results[k] for k in keys}
+    cols["ts"] = iso_from_epochs(results["ts"])
+    it = results["iteration"]
+    cols["iteration"] = pd.arrays.IntegerArray(it, it < 0)  # -1 -> empty cell, as before
+    pd.DataFrame(cols).reindex(columns=keys).to_csv(path, index=False)
+
+# Numeric system.csv columns; everything else (ts, *_json) stays object.
+SYSTEM_DTYPES = {
+    "epoch": "float64",
+    "cpu_percent": "float64",
+    "mem_total": "int64",
+    "mem_available": "int64",
+    "mem_used": "int64",
+    "mem_percent": "float64",
+    "swap_percent": "float64",
+    "tcp_conn_count_to_target": "int32",
+    "proc_cpu_percent": "float64",
+    "proc_num_fds": "Int32",   # nullable: None when the server PID could not be read
+}
+
+def system_frame(rows):
+    df = pd.DataFrame.from_records(rows, columns=list(rows[0].keys())).astype(SYSTEM_DTYPES)
+    df["tcp_states_json"] = df["tcp_states_json"].map(json.dumps)
+    df["proc_mem_json"] = df["proc_mem_json"].map(lambda m: json.dumps(m) if m else None)
+    return df
 
 def write_csv_system(path, rows):
     if not rows:
         return
-    keys = list(rows[0].keys())
-    with open(path,"w",newline="") as f:
-        w = csv.DictWriter(f, fieldnames=keys)
-        w.writeheader()
-        for r in rows:
-            w.writerow(r)
+    system_frame(rows).to_csv(path, index=False)
+
+# Parquet output (--parquet) needs pyarrow; imported lazily so CSV-only runs don't.
+# Schemas are explicit so every run writes the same column types: inferred from the data, a run without
+# errors would store err (or a run without --server-pid proc_mem_json) as type null instead of string.
+def request_schema(pa):
+    return pa.schema([
+        ("idx", pa.int32()), ("ts", pa.string()), ("success", pa.bool_()), ("latency_ms", pa.float64()),
+        ("resp_len", pa.int32()), ("err", pa.string()), ("iteration", pa.int32()),
+    ])
+
+def system_schema(pa, columns):
+    """SYSTEM_DTYPES as Arrow types; the remaining system.csv columns (ts, *_json) are strings."""
+    types = {"float64": pa.float64(), "int64": pa.int64(), "int32": pa.int32(), "Int32": pa.int32()}
+    return pa.schema([(c, types[SYSTEM_DTYPES[c]] if c in SYSTEM_DTYPES else pa.string()) for c in columns])
+
+def write_parquet_requests(path, results):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    cols = {k: results[k] for k in REQUEST_KEYS}
+    cols["ts"] = pa.array(iso_from_epochs(results["ts"]), type=pa.string())
+    it = results["iteration"]
+    cols["iteration"] = pa.array(it, mask=it < 0, type=pa.int32())
+    pq.write_table(pa.Table.from_pydict(cols, schema=request_schema(pa)), path, compression="zstd")
+
+def write_parquet_system(path, rows):
+    if not rows:
+        return
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    df = system_frame(rows)
+    table = pa.Table.from_pandas(df, schema=system_schema(pa, df.columns), preserve_index=False)
+    pq.write_table(table, path, compression="zstd")
 
 
 # ------------------------
@@ -290,9 +471,28 @@ async def run_scenario(args):
     if args.host not in ("127.0.0.1","localhost") and not args.allow_remote:
         print("Target restricted to localhost by default. Use --allow-remote to override.")
         return 1
+    if args.parquet:
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            print("--parquet requires pyarrow (pip install pyarrow).")
+            return 1
+
+    safe_mkdir(args.outdir)
+    req_csv = os.path.join(args.outdir, "requests.csv")
+    sys_csv = os.path.join(args.outdir, "system.csv")
+    summary_json = os.path.join(args.outdir, "summary.json")
+    req_parquet = os.path.join(args.outdir, "requests.parquet")
+    sys_parquet = os.path.join(args.outdir, "system.parquet")
+    # analyze_runs/normalize_results prefer .parquet over .csv, so a file left by an earlier run into the same
+    # outdir must not survive a run that doesn't rewrite it (no --parquet, or requests with --stream-requests).
+    for path in (req_parquet, sys_parquet):
+        if os.path.exists(path):
+            os.remove(path)
 
     sampler = SystemSampler(sample_interval=args.sample_interval, server_pid=args.server_pid, target_port=args.port)
-    load = LoadGen(args.host, args.port, args.concurrency, args.total, mode=args.mode, payload=args.payload.encode(), timeout=args.timeout)
+    load = LoadGen(args.host, args.port, args.concurrency, args.total, mode=args.mode, payload=args.payload.encode(),
+                   timeout=args.timeout, stream_path=req_csv if args.stream_requests else None)
 
     sampler_task = asyncio.create_task(sampler.run())
     t0 = time.time()
@@ -304,26 +504,27 @@ async def run_scenario(args):
         await asyncio.sleep(0.05)
 
     t1 = time.time()
-    safe_mkdir(args.outdir)
-    req_csv = os.path.join(args.outdir, "requests.csv")
-    sys_csv = os.path.join(args.outdir, "system.csv")
-    summary_json = os.path.join(args.outdir, "summary.json")
-
-    write_csv_requests(req_csv, load.results)
+    results = load.columns()
+    if not args.stream_requests:
+        write_csv_requests(req_csv, results)
     write_csv_system(sys_csv, sampler.rows)
-    s = summarize(load.results)
-    s.update({
+    if args.parquet:
+        if not args.stream_requests:
+            write_parquet_requests(req_parquet, results)
+        write_parquet_system(sys_parquet, sampler.rows)
+    s = {
+        **summarize(results),
         "start_time": datetime.utcfromtimestamp(t0).isoformat() + "Z",
         "end_time": datetime.utcfromtimestamp(t1).isoformat() + "Z",
         "duration_s": t1 - t0,
         "sample_count": len(sampler.rows),
         "args": vars(args)
-    })
-    s = clean_for_json(s)
-    with open(summary_json, "w") as f:
-        json.dump(s, f, indent=2)
+    }
+    data = dumps_json(s)
+    with open(summary_json, "wb") as f:
+        f.write(data)
     print(f"\n[DONE] Test complete. Results written to {args.outdir}")
-    print(json.dumps(s, indent=2))
+    print(data.decode("utf-8"))
     return 0
 
 
@@ -367,6 +568,8 @@ def parse_args():
     p.add_argument("--sample-interval", type=float, default=0.5, help="System sampling interval (s)")
     p.add_argument("--server-pid", type=int, default=None, help="Optional server PID to sample")
     p.add_argument("--outdir", default="dos_results", help="Output directory")
+    p.add_argument("--parquet", action="store_true", help="Also write requests.parquet/system.parquet (needs pyarrow; requests.parquet is skipped with --stream-requests)")
+    p.add_argument("--stream-requests", action="store_true", help="Append requests.csv during the run instead of at the end (bounded memory for long runs)")
     p.add_argument("--allow-remote", action="store_true", help="Allow non-localhost targets")
     p.add_argument("--compare", nargs=2, help="Compare two result directories")
     p.add_argument("--report", help="If comparing, path to save CSV report")
@@ -382,9 +585,18 @@ def main():
         a, b = args.compare
         compare_dirs(a, b, out_csv=args.report)
         sys.exit(0)
-    loop = asyncio.get_event_loop()
+    run_kwargs = {}
+    try:
+        import uvloop  # optional: libuv-based event loop, fewer syscalls per wakeup on Linux
+    except ImportError:
+        uvloop = None
+    if uvloop is not None:
+        if sys.version_info >= (3, 12):
+            run_kwargs["loop_factory"] = uvloop.new_event_loop
+        else:
+            uvloop.install()  # loop_factory is 3.12+; older Pythons go through the event loop policy
     try:
-        res = loop.run_until_complete(run_scenario(args))
+        res = asyncio.run(run_scenario(args), **run_kwargs)
         sys.exit(res if res is not None else 0)
     except KeyboardInterrupt:
         print("Interrupted")
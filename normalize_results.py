@@ -12,13 +12,11 @@ Usage:
 Notes:
  - For CAN CSV we assume the last 'frame_id' value is the total frames sent.
  - For CAN CSV we assume frames are successful unless you supply a receiver-side success count (see --successes).
- - Outputs: outdir/{summary.json, requests.csv, system.csv}
+ - Outputs: outdir/{summary.json, requests.csv, system.csv} (plus requests/system.parquet if the PQC run has them)
 """
 import argparse
-import csv
 import json
 import os
-import math
 from datetime import datetime
 import pandas as pd
 import numpy as np
@@ -26,7 +24,7 @@ import numpy as np
 def normalize_pqc(run_dir, outdir):
     # expect summary.json, requests.csv, system.csv optionally
     os.makedirs(outdir, exist_ok=True)
-    for name in ("summary.json","requests.csv","system.csv"):
+    for name in ("summary.json","requests.csv","system.csv","requests.parquet","system.parquet"):
         src = os.path.join(run_dir, name)
         dst = os.path.join(outdir, name)
         if os.path.exists(src):
@@ -89,20 +87,15 @@ def normalize_can(csv_path, total_frames=None, successes=None, outdir="normalize
 
     # Create an aggregated requests.csv: one row per sample (frame_id)
     req_csv = os.path.join(outdir,"requests.csv")
-    with open(req_csv, "w", newline="") as f:
-        w = csv.DictWriter(f, fieldnames=["idx","ts","success","latency_ms","resp_len","err"])
-        w.writeheader()
-        for i,row in df.iterrows():
-            ts = row['timestamp']
-            idx = int(row['frame_id'])
-            w.writerow({
-                "idx": idx,
-                "ts": datetime.utcfromtimestamp(float(ts)).isoformat() + "Z" if not math.isnan(float(ts)) else "",
-                "success": True,
-                "latency_ms": "",
-                "resp_len": "",
-                "err": ""
-            })
+    ts = pd.to_datetime(pd.to_numeric(df['timestamp'], errors='coerce'), unit='s', utc=True, errors='coerce')
+    pd.DataFrame({
+        "idx": df['frame_id'].astype(int),
+        "ts": ts.dt.strftime('%Y-%m-%dT%H:%M:%S.%fZ').fillna(""),
+        "success": True,
+        "latency_ms": "",
+        "resp_len": "",
+        "err": ""
+    }).to_csv(req_csv, index=False)
     print(f"CAN normalization done -> {outdir} (assumed_all_success={assumed})")
 
 def main():
@@ -11,147 +11,370 @@ import threading
 import queue
 import psutil
 import random
+import multiprocessing
+import signal
+import errno
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 
 HOST = "127.0.0.1"
 PORT = 65433
 MAX_CONN_QUEUE = 100 #Number of pending connections before refusal
-RECV_TIMEOUT = 6.0 #in seconds
+RECV_TIMEOUT = 6.0 #in seconds, for reading a whole frame set (one deadline per connection, not per recv)
+FRESHNESS = struct.Struct(">Q") #precompiled: format parsed once
+LENGTH_PREFIX = struct.Struct(">H")
+REPLAY_KEY = struct.Struct("<Q") #first 8 digest bytes as one int
+MSG_WAITALL = getattr(socket, "MSG_WAITALL", 0) #0 = plain recv where unsupported
+RECV_BUF_SIZE = 8192 #one recv_into fits a whole message+signature+public key frame set (~3.8 KB for Dilithium2)
 WORKLOAD = int(os.environ.get("PQC_WORKLOAD", "50000")) #computational load factor
+WORKLOAD_ROUNDS = WORKLOAD // 500  # SHA3-512 chain length per verified message
+# 64 KB of random input for the workload, read once; each round takes the next 64-byte slice
+# instead of calling os.urandom (one getrandom syscall) per round.
+RNG_POOL = memoryview(os.urandom(65536))
+rng_offset = 0
 
 # --- adaptive control ---
 CPU_LIMIT = 85.0     # % threshold to start rejecting new clients - if CPU >85% new #messages are dropped
 DROP_PROB_BASE = 0.1 # baseline random drop - even when CPU is low there is a 10% drop rate
 MSG_QUEUE = queue.Queue(maxsize=500)
+CONN_WORKERS = 16    # threads reading accepted connections
+# accepted connections that are being read or waiting for a CONN_WORKERS thread; beyond this new ones are dropped
+# at accept instead of piling up in the executor's (unbounded) work queue
+CONN_SLOTS = threading.BoundedSemaphore(CONN_WORKERS * 4)
+VERIFY_BATCH = 4     # max queued messages a worker sends to the verify pool per call
+VERIFY_PROCS = os.cpu_count() or 4  # verify processes, each fed by one worker thread
+VERIFY_POOL = None   # ProcessPoolExecutor; replaced by run_verify_batch if a verify process dies
+VERIFY_POOL_LOCK = threading.Lock()
+MAX_POOL_REBUILDS = 3  # after this many dead pools the receiver shuts down instead of skewing the results
+pool_rebuilds = 0
 
 # --- replay cache --- to detect and reject replayed messages - prevents replay attack
-SEEN_HASHES = set()
+# Ring of two Bloom filters (k=2, m=2**17 bits = 16 KB each) keyed on the first 8 bytes of the SHA-256
+# digest as one 64-bit int: bits 0..16 and 17..33 are the two hash functions. New keys go into the current
+# generation; once it holds SEEN_GENERATION entries the older generation is wiped and becomes current. The
+# newest 1024-2048 keys are therefore always remembered (FIFO by generation), with ~0.05% false positives.
+SEEN_BITS = 1 << 17
+SEEN_MASK = SEEN_BITS - 1
+SEEN_RING = [bytearray(SEEN_BITS // 8), bytearray(SEEN_BITS // 8)]  # [current, previous]
 MAX_HASHES = 2048
+SEEN_GENERATION = MAX_HASHES // 2
+seen_inserts = 0
+SEEN_LOCK = threading.Lock()  # worker threads share the ring: bit updates and generation swaps must not interleave
 
-''' Reads exactly length bytes from a tcp connection'''
-def recv_exact(conn, length):
-    data = b""
-    while len(data) < length:
-        chunk = conn.recv(length - len(data))
-        if not chunk:
-            raise ConnectionError("connection closed early")
-        data += chunk
-    return data
 
+def seen_before(key):
+    """True if the 64-bit digest key is (probably) in the replay cache; otherwise adds it and returns False."""
+    global seen_inserts
+    h1 = key & SEEN_MASK
+    h2 = (key >> 17) & SEEN_MASK
+    b1, m1 = h1 >> 3, 1 << (h1 & 7)
+    b2, m2 = h2 >> 3, 1 << (h2 & 7)
+    with SEEN_LOCK:
+        cur, prev = SEEN_RING
+        if (cur[b1] & m1 and cur[b2] & m2) or (prev[b1] & m1 and prev[b2] & m2):
+            return True
+        if seen_inserts >= SEEN_GENERATION:
+            prev[:] = bytes(len(prev))  # evict the oldest generation, reuse it as current
+            SEEN_RING.reverse()
+            cur = prev
+            seen_inserts = 0
+        cur[b1] |= m1
+        cur[b2] |= m2
+        seen_inserts += 1
+        return False
 
-'''Splits the incoming messafe into structured oayload and freshness'''
-def handle_message(message, signature, public_key, addr):
-    """Actual verification + heavy math here."""
-    structured_payload = message[:-8]
-    freshness = message[-8:]
+# --- public key cache --- senders normally reuse one Dilithium2 key pair, so identical 1312-byte keys are
+# collapsed into one shared bytes object (keyed on the key itself) before queueing, instead of every
+# queued message holding its own copy. Reset when MAX_PUBLIC_KEYS distinct keys have been seen.
+PUBLIC_KEYS = {}
+MAX_PUBLIC_KEYS = 256
 
+
+def intern_public_key(public_key):
+    pk = PUBLIC_KEYS.get(public_key)
+    if pk is None:
+        if len(PUBLIC_KEYS) >= MAX_PUBLIC_KEYS:
+            PUBLIC_KEYS.clear()
+        pk = PUBLIC_KEYS[public_key] = public_key
+    return pk
+
+''' Sets the timeout for the next recv on conn. settimeout() would switch the fd to non-blocking, and Linux
+ignores MSG_WAITALL on non-blocking sockets, so on POSIX the timeout is set in the kernel (SO_RCVTIMEO) instead.'''
+def set_recv_timeout(conn, seconds):
+    if MSG_WAITALL and os.name == "posix" and hasattr(socket, "SO_RCVTIMEO"):
+        sec = int(seconds)
+        usec = max(int((seconds - sec) * 1_000_000), 0 if sec else 1)  # a 0/0 timeval would mean "no timeout"
+        conn.setsockopt(socket.SOL_SOCKET, socket.SO_RCVTIMEO, struct.pack("ll", sec, usec))
+    else:
+        conn.settimeout(seconds)
+
+''' Reads from a tcp connection into buf until at least upto bytes are buffered (buf[:filled] already holds data).
+recv_into a preallocated bytearray instead of bytes += chunk, so no per-chunk copies; grows buf for oversized frames.
+The first read takes whatever has arrived (up to the whole buffer); after that the missing bytes of the current
+frame are asked for exactly, with MSG_WAITALL where the platform has it. The loop covers short returns.
+Each recv only gets the time left until deadline (time.monotonic()), so trickling bytes can't extend it.'''
+def fill_buffer(conn, buf, filled, upto, deadline):
+    if upto > len(buf):
+        buf.extend(bytes(upto - len(buf)))
+    with memoryview(buf) as view:
+        while filled < upto:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise ConnectionError("recv timeout")
+            set_recv_timeout(conn, remaining)
+            try:
+                if filled:
+                    n = conn.recv_into(view[filled:upto], 0, MSG_WAITALL)
+                else:
+                    n = conn.recv_into(view)
+            except BlockingIOError:  # EAGAIN: SO_RCVTIMEO expired
+                raise ConnectionError("recv timeout")
+            if not n:
+                raise ConnectionError("connection closed early")
+            filled += n
+    return filled
+
+''' Reads count 2-byte-length-prefixed frames. The first recv_into asks for up to RECV_BUF_SIZE bytes, which normally
+holds all three frames (message, signature, public key) at once; more reads happen only on a short read.
+The whole frame set must arrive within RECV_TIMEOUT.'''
+def recv_frames(conn, count):
+    deadline = time.monotonic() + RECV_TIMEOUT
+    buf = bytearray(RECV_BUF_SIZE)
+    filled = pos = 0
+    frames = []
+    for _ in range(count):
+        filled = fill_buffer(conn, buf, filled, pos + 2, deadline)
+        length = LENGTH_PREFIX.unpack_from(buf, pos)[0]
+        pos += 2
+        filled = fill_buffer(conn, buf, filled, pos + length, deadline)
+        frames.append(bytes(buf[pos:pos + length]))
+        pos += length
+    return frames
+
+
+'''Pre-verify gate: reads the 8-byte freshness timestamp in place, then checks the replay cache'''
+def check_message(message, signature, addr):
+    """Freshness + replay checks, done in the receiver process before a message is sent for verification."""
     try:
-        ts = struct.unpack(">Q", freshness)[0]
+        ts = FRESHNESS.unpack_from(message, len(message) - 8)[0] #last 8 bytes, read in place
     except Exception:
         print(f"[{time.strftime('%H:%M:%S')}] !!! Bad freshness from {addr}")
-        return
+        return False
 
     # reject stale messages early - if message's timestamp differs by more than 30 seconds #discard it 
     now = int(time.time())
     if abs(now - ts) > 30:
-        return
+        return False
 
     # replay protection - Prevents replay attacks by hashing message + signature.If already seen → drop. Maintains a rolling cache (up to 2048 entries).
-    msg_hash = hashlib.sha256(message + signature).hexdigest()
-    if msg_hash in SEEN_HASHES:
-        return
-    SEEN_HASHES.add(msg_hash)
-    if len(SEEN_HASHES) > MAX_HASHES:
-        SEEN_HASHES.pop()
+    h = hashlib.sha256(message)  # fed incrementally: no temporary message + signature copy (~2.5 KB)
+    h.update(signature)
+    if seen_before(REPLAY_KEY.unpack_from(h.digest())[0]):
+        return False
+    return True
+
+''' Runs once in each verify process: one Dilithium2 context for the process lifetime, plus a watchdog
+so the process exits if the receiver dies without shutting the pool down (e.g. SIGKILL).'''
+def init_verifier(parent_pid):
+    global VERIFIER
+    VERIFIER = oqs.Signature("Dilithium2")
+    threading.Thread(target=watch_parent, args=(parent_pid,), daemon=True).start()
 
+''' Polls the parent pid once a second; when the receiver is gone we are re-parented, so exit.'''
+def watch_parent(parent_pid):
+    while os.getppid() == parent_pid:
+        time.sleep(1.0)
+    os._exit(0)
+
+''' SIGTERM (run_experiments.sh stops the receiver with kill) -> SystemExit, so main()'s shutdown path runs
+and the verify processes are stopped instead of being orphaned.'''
+def handle_sigterm(signum, frame):
+    raise SystemExit(0)
+
+''' Actual verification + heavy math, run inside a verify process. Returns (True, ms) or (False, None).'''
+def verify_message(message, signature, public_key):
     start = time.time()
 
     # verify authenticity PQC signature using dilithium2. If sgnature is invalid - drop
-    try:
-        with oqs.Signature("Dilithium2") as verifier:
-            if not verifier.verify(message, signature, public_key):
-                print(f"[{time.strftime('%H:%M:%S')}] [FAILURE] PQC signature failed from {addr}")
-                return
-    except Exception as e:
-        print(f"[{time.strftime('%H:%M:%S')}] Verify error {addr}: {e}")
-        return
+    if not VERIFIER.verify(message, signature, public_key):
+        return False, None
 
     # simulate heavy cryptographic load for bench marking
+    global rng_offset
+    sha3_512, pool = hashlib.sha3_512, RNG_POOL  # locals: no global/attribute lookups per round
+    off = rng_offset
     acc = b""
-    for _ in range(WORKLOAD // 500):
-        data = os.urandom(64)
-        acc = hashlib.sha3_512(data + acc).digest()
+    for _ in range(WORKLOAD_ROUNDS):
+        h = sha3_512(pool[off:off + 64])
+        h.update(acc)  # == sha3_512(data + acc), without the concatenated copy
+        acc = h.digest()
+        off = (off + 64) & 0xFFC0
+    rng_offset = off  # per process; it only picks benchmark input
 
-    duration = (time.time() - start) * 1000
-    print(f"[{time.strftime('%H:%M:%S')}] [DONE] PQC verified from {addr} ({duration:.2f} ms)")
+    return True, (time.time() - start) * 1000
 
-''' Each worker continuously fetches messages from queue and processes them using handle_message.'''
-def worker():
-    while True:
+''' Verifies a batch of (message, signature, public_key) back to back in one verify process, so the
+pickling/IPC round trip is paid once per batch. Errors come back as (None, text) for the caller to log.'''
+def verify_batch(batch):
+    results = []
+    for message, signature, public_key in batch:
         try:
-            msg = MSG_QUEUE.get()
-            if msg is None:
+            results.append(verify_message(message, signature, public_key))
+        except Exception as e:
+            results.append((None, str(e)))
+    return results
+
+''' Verify processes with their own Dilithium2 context and a watchdog on this (parent) process.'''
+def make_verify_pool():
+    return ProcessPoolExecutor(max_workers=VERIFY_PROCS, initializer=init_verifier, initargs=(os.getpid(),),
+                               mp_context=multiprocessing.get_context("spawn"))
+
+''' Runs verify_batch in VERIFY_POOL. If a verify process died (segfault/OOM in liboqs, SIGKILL) the executor is
+broken for good: the first worker to see it replaces the pool, and the batch is retried once on the new one.
+After MAX_POOL_REBUILDS the receiver is stopped (SIGTERM -> normal shutdown) rather than silently verifying nothing.'''
+def run_verify_batch(items):
+    global VERIFY_POOL, pool_rebuilds
+    pool = VERIFY_POOL
+    try:
+        return pool.submit(verify_batch, items).result()
+    except BrokenProcessPool:
+        with VERIFY_POOL_LOCK:
+            if pool_rebuilds >= MAX_POOL_REBUILDS:
+                raise
+            if VERIFY_POOL is pool:  # not yet replaced by another worker
+                pool_rebuilds += 1
+                pool.shutdown(wait=False, cancel_futures=True)
+                if pool_rebuilds >= MAX_POOL_REBUILDS:
+                    print(f"[{time.strftime('%H:%M:%S')}] [FAILURE] verify pool died {pool_rebuilds} times, shutting receiver down")
+                    os.kill(os.getpid(), signal.SIGTERM)
+                    raise
+                print(f"[{time.strftime('%H:%M:%S')}] [FAILURE] verify process died, rebuilding pool ({pool_rebuilds}/{MAX_POOL_REBUILDS})")
+                VERIFY_POOL = make_verify_pool()
+            pool = VERIFY_POOL
+    return pool.submit(verify_batch, items).result()
+
+''' Checks a drained batch locally, then ships the survivors to the verify pool in one call and logs the results.'''
+def handle_message_batch(batch):
+    ready = [msg for msg in batch if check_message(msg[0], msg[1], msg[3])]
+    if not ready:
+        return
+    results = run_verify_batch([msg[:3] for msg in ready])
+    for (_, _, _, addr), (ok, value) in zip(ready, results):
+        if ok:
+            print(f"[{time.strftime('%H:%M:%S')}] [DONE] PQC verified from {addr} ({value:.2f} ms)")
+        elif ok is None:
+            print(f"[{time.strftime('%H:%M:%S')}] Verify error {addr}: {value}")
+        else:
+            print(f"[{time.strftime('%H:%M:%S')}] [FAILURE] PQC signature failed from {addr}")
+
+
+''' Each worker continuously fetches messages from queue and processes them using handle_message_batch.
+Verification runs in the process pool (no GIL contention between verifies); the thread only feeds it.
+Blocks for one message, then drains up to VERIFY_BATCH - 1 more that are already queued.'''
+def worker():
+    running = True
+    while running:
+        batch = [MSG_QUEUE.get()]
+        while batch[-1] is not None and len(batch) < VERIFY_BATCH:
+            try:
+                batch.append(MSG_QUEUE.get_nowait())
+            except queue.Empty:
                 break
-            handle_message(*msg)
+        if batch[-1] is None:   # shutdown sentinel; finish what was drained before it
+            running = False
+            batch.pop()
+        try:
+            handle_message_batch(batch)
         except Exception as e:
             print("Worker error:", e)
         finally:
-            MSG_QUEUE.task_done()
+            for _ in range(len(batch) + (not running)):
+                MSG_QUEUE.task_done()
 
 
 def handle_connection(conn, addr):
     try:
-    	'''For each client connection, set timeout, ready 2 byte message length and message body'''
-        conn.settimeout(RECV_TIMEOUT)
-        raw = recv_exact(conn, 2)
-        msg_len = int.from_bytes(raw, "big")
-        message = recv_exact(conn, msg_len)
-	'''Next 2 bytes → signature length, then actual signature.'''
-        raw = recv_exact(conn, 2)
-        sig_len = int.from_bytes(raw, "big")
-        signature = recv_exact(conn, sig_len)
-	'''Read public key'''
-        raw = recv_exact(conn, 2)
-        pk_len = int.from_bytes(raw, "big")
-        public_key = recv_exact(conn, pk_len)
+        '''Read all three frames: message, signature, public key (2-byte length + body each), within RECV_TIMEOUT.'''
+        message, signature, public_key = recv_frames(conn, 3)
     except Exception as e:
         print(f"[{time.strftime('%H:%M:%S')}] Incomplete recv from {addr}: {e}")
         return
     finally:
         conn.close()
+        CONN_SLOTS.release()
 
-    # Adaptive overload control - Drops message if CPU is above 85%, or Random drop probability (10%) triggers.
-    cpu = psutil.cpu_percent(interval=0.0)
-    if cpu > CPU_LIMIT or random.random() < DROP_PROB_BASE:
-        print(f"[{time.strftime('%H:%M:%S')}] [DONE] Drop (CPU={cpu:.1f}%) from {addr}")
+    # Adaptive overload control - the CPU > 85% check runs in main() before the connection is handed
+    # to the pool; here only the random drop probability (10%) applies.
+    if random.random() < DROP_PROB_BASE:
+        print(f"[{time.strftime('%H:%M:%S')}] [DONE] Drop (random) from {addr}")
         return
 
     try:
-        MSG_QUEUE.put_nowait((message, signature, public_key, addr)) #Queueing message for background workers
+        MSG_QUEUE.put_nowait((message, signature, intern_public_key(public_key), addr)) #Queueing message for background workers
     except queue.Full:
         print(f"[{time.strftime('%H:%M:%S')}] [DONE] Queue full, dropping from {addr}")
 
 
 def main():
     print(f"Starting PQC receiver on {HOST}:{PORT} — adaptive threaded mode")
-    # spawn worker threads - starts 4 background threads for parallell processing
-    for _ in range(4): 
+    # verify processes (own Dilithium2 context each), each fed by one worker thread
+    global VERIFY_POOL
+    VERIFY_POOL = make_verify_pool()
+    signal.signal(signal.SIGTERM, handle_sigterm)
+    for _ in range(VERIFY_PROCS):
         threading.Thread(target=worker, daemon=True).start()
     # Create server socket 
     with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
         s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        #Linux: accept() normally waits for the client's first data. Idle handshakes are only delayed (accepted after
+        #~RECV_TIMEOUT plus a SYN-ACK retransmit), not filtered, and then still hold a CONN_WORKERS slot until recv times out
+        if hasattr(socket, "TCP_DEFER_ACCEPT"):
+            s.setsockopt(socket.IPPROTO_TCP, socket.TCP_DEFER_ACCEPT, int(RECV_TIMEOUT))
         s.bind((HOST, PORT))
         s.listen(MAX_CONN_QUEUE)
-    #Accepts each client and spawns a new thread to handle it asynchronously.
+    #Accepts each client and hands it to a fixed pool of connection threads (no thread creation per accept).
+    #Under overload the connection is closed right away, before it costs a pool slot.
+        pool = ThreadPoolExecutor(max_workers=CONN_WORKERS, thread_name_prefix="pqc-conn")
+        terminated = False
         try:
             while True:
-                conn, addr = s.accept()
-                threading.Thread(target=handle_connection, args=(conn, addr), daemon=True).start()
+                try:
+                    conn, addr = s.accept()
+                except OSError as e:
+                    if e.errno not in (errno.EMFILE, errno.ENFILE):
+                        raise
+                    print(f"[{time.strftime('%H:%M:%S')}] accept failed (out of file descriptors), backing off")
+                    time.sleep(0.1)
+                    continue
+                conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1) #no Nagle/delayed-ACK stall on small frames
+                cpu = psutil.cpu_percent(interval=0.0)
+                if cpu > CPU_LIMIT:
+                    conn.close()
+                    print(f"[{time.strftime('%H:%M:%S')}] [DONE] Drop (CPU={cpu:.1f}%) from {addr}")
+                    continue
+                if not CONN_SLOTS.acquire(blocking=False):  # released by handle_connection
+                    conn.close()
+                    print(f"[{time.strftime('%H:%M:%S')}] [DONE] Drop (pool full) from {addr}")
+                    continue
+                pool.submit(handle_connection, conn, addr)
         except KeyboardInterrupt:
             print("\nPQC receiver shutting down.")
+        except SystemExit:
+            print("\nPQC receiver terminated (SIGTERM), shutting down.")
+            terminated = True
         finally:
-            for _ in range(4):
+            pool.shutdown(wait=False, cancel_futures=True)
+            #on SIGTERM drop the backlog instead of verifying it, so the port and the verify processes are freed promptly
+            while terminated:
+                try:
+                    MSG_QUEUE.get_nowait()
+                except queue.Empty:
+                    break
+                MSG_QUEUE.task_done()
+            for _ in range(VERIFY_PROCS):
                 MSG_QUEUE.put(None)
             MSG_QUEUE.join()
+            VERIFY_POOL.shutdown()
 
 
 if __name__ == "__main__":
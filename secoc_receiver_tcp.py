@@ -24,13 +24,34 @@ import os
 HOST = "127.0.0.1"
 PORT = 65432
 SECRET_KEY = b"my_shared_secret"
+# HMAC-SHA256 with the key already absorbed: the inner (key ^ ipad) and outer (key ^ opad) blocks are
+# compressed once here, and each message starts from a .copy() of these midstates.
+HMAC_BASE = hmac.new(SECRET_KEY, digestmod=hashlib.sha256)
 PAYLOAD_FMT = ">H I h h B H ff 27x"
+# Precompiled formats: the format string is parsed once, and unpack_from reads straight out of the buffer
+PAYLOAD = struct.Struct(PAYLOAD_FMT)
+FRESHNESS = struct.Struct(">Q")
+LENGTH_PREFIX = struct.Struct(">H")
+REPLAY_KEY = struct.Struct("<Q")   # 8 HMAC output bytes as one int
+TAG_LEN = 8                     # Truncated HMAC-SHA256 tag length; tags of any other length are rejected
 RECV_TIMEOUT = 6.0
+MSG_WAITALL = getattr(socket, "MSG_WAITALL", 0)  # 0 = plain recv where unsupported
+RECV_BUF_SIZE = 512             # Whole msg + tag frame set (68 bytes) arrives in one recv_into
 MAX_CONN_QUEUE = 50
 # --- Replay & overload realism ---
-REPLAY_CACHE_SIZE = 1024      # Number of recent message hashes to remember
-REPLAY_CACHE = collections.deque(maxlen=REPLAY_CACHE_SIZE)
-REPLAY_SET = set()
+REPLAY_CACHE_SIZE = 1024      # Number of recent message hashes to remember (at least)
+# Ring of two Bloom filters (k=2, m=2**17 bits = 16 KB each) keyed on 8 bytes of the HMAC output as one 64-bit int;
+# bits 0..16 and 17..33 are the two hash functions. When the current generation holds REPLAY_CACHE_SIZE entries the older one is
+# wiped and becomes current, so eviction is FIFO by generation and never drops the newest hashes.
+REPLAY_BITS = 1 << 17
+REPLAY_MASK = REPLAY_BITS - 1
+REPLAY_RING = [bytearray(REPLAY_BITS // 8), bytearray(REPLAY_BITS // 8)]  # [current, previous]
+replay_inserts = 0
+# Negative cache: (message + tag) pairs whose HMAC already failed, so a flood repeating them is
+# rejected with one set lookup instead of an HMAC computation each time.
+BAD_TAG_CACHE_SIZE = 4096
+BAD_TAG_CACHE = collections.deque()
+BAD_TAG_SET = set()
 
 FRESHNESS_MAX_AGE = 5         # Drop messages older than 5s
 FRESHNESS_FUTURE_TOL = 5      # Drop messages from >5s in future
@@ -44,30 +65,86 @@ if RANDOM_SEED:
     random.seed(RANDOM_SEED)
 
 
-def recv_exact(conn, length):
-    data = b""
-    while len(data) < length:
-        try:
-            chunk = conn.recv(length - len(data))
-        except socket.timeout:
-            raise ConnectionError("recv timeout")
-        if not chunk:
-            raise ConnectionError("connection closed early / incomplete")
-        data += chunk
-    return data
-
-def record_replay(msg_hash):
-    """Record message hash in replay cache and return True if new."""
-    if msg_hash in REPLAY_SET:
+def set_recv_timeout(conn, seconds):
+    """Timeout for the next recv, without making the fd non-blocking (settimeout() would, and Linux then ignores MSG_WAITALL)."""
+    if MSG_WAITALL and os.name == "posix" and hasattr(socket, "SO_RCVTIMEO"):
+        sec = int(seconds)
+        usec = max(int((seconds - sec) * 1_000_000), 0 if sec else 1)  # a 0/0 timeval would mean "no timeout"
+        conn.setsockopt(socket.SOL_SOCKET, socket.SO_RCVTIMEO, struct.pack("ll", sec, usec))
+    else:
+        conn.settimeout(seconds)
+
+def fill_buffer(conn, buf, filled, upto, deadline):
+    """recv_into buf until at least `upto` bytes are buffered (buf[:filled] already holds data); grows buf if needed.
+
+    The first read takes whatever has arrived, up to the whole buffer. Later reads ask for exactly the missing
+    bytes with MSG_WAITALL, and the loop handles short returns. Each recv only gets the time left until
+    `deadline` (time.monotonic()), so a client trickling bytes can't hold the serial accept loop past it.
+    """
+    if upto > len(buf):
+        buf.extend(bytes(upto - len(buf)))
+    with memoryview(buf) as view:
+        while filled < upto:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise ConnectionError("recv timeout")
+            set_recv_timeout(conn, remaining)
+            try:
+                if filled:
+                    n = conn.recv_into(view[filled:upto], 0, MSG_WAITALL)
+                else:
+                    n = conn.recv_into(view)
+            except (socket.timeout, BlockingIOError):  # settimeout() expiry / EAGAIN from SO_RCVTIMEO
+                raise ConnectionError("recv timeout")
+            if not n:
+                raise ConnectionError("connection closed early / incomplete")
+            filled += n
+    return filled
+
+def recv_frames(conn, count):
+    """Read `count` 2-byte-length-prefixed frames within RECV_TIMEOUT, normally with a single recv_into."""
+    deadline = time.monotonic() + RECV_TIMEOUT
+    buf = bytearray(RECV_BUF_SIZE)
+    filled = pos = 0
+    frames = []
+    for _ in range(count):
+        filled = fill_buffer(conn, buf, filled, pos + 2, deadline)
+        length = LENGTH_PREFIX.unpack_from(buf, pos)[0]
+        pos += 2
+        filled = fill_buffer(conn, buf, filled, pos + length, deadline)
+        frames.append(bytes(buf[pos:pos + length]))
+        pos += length
+    return frames
+
+def record_replay(key):
+    """Record a 64-bit digest key in the replay cache and return True if new (False = probable replay)."""
+    global replay_inserts
+    h1 = key & REPLAY_MASK
+    h2 = (key >> 17) & REPLAY_MASK
+    b1, m1 = h1 >> 3, 1 << (h1 & 7)
+    b2, m2 = h2 >> 3, 1 << (h2 & 7)
+    cur, prev = REPLAY_RING
+    if (cur[b1] & m1 and cur[b2] & m2) or (prev[b1] & m1 and prev[b2] & m2):
         return False
-    if len(REPLAY_SET) >= REPLAY_CACHE_SIZE:
-        old = REPLAY_CACHE.popleft()
-        REPLAY_SET.discard(old)
-    REPLAY_CACHE.append(msg_hash)
-    REPLAY_SET.add(msg_hash)
+    if replay_inserts >= REPLAY_CACHE_SIZE:
+        prev[:] = bytes(len(prev))  # evict the oldest generation, reuse it as current
+        REPLAY_RING.reverse()
+        cur = prev
+        replay_inserts = 0
+    cur[b1] |= m1
+    cur[b2] |= m2
+    replay_inserts += 1
     return True
 
 
+def record_bad_tag(key):
+    """Remember a (message + tag) pair that failed HMAC verification; evicts the oldest first."""
+    if len(BAD_TAG_CACHE) >= BAD_TAG_CACHE_SIZE:
+        BAD_TAG_SET.discard(BAD_TAG_CACHE.popleft())
+    BAD_TAG_CACHE.append(key)
+    BAD_TAG_SET.add(key)
+
+
 def compute_drop_prob():
     """Compute drop probability based on CPU load."""
     try:
@@ -79,16 +156,9 @@ def compute_drop_prob():
 
 
 def handle_connection(conn, addr):
-    conn.settimeout(RECV_TIMEOUT)
     try:
         # Read framed message and tag
-        raw = recv_exact(conn, 2)
-        msg_len = int.from_bytes(raw, "big")
-        message = recv_exact(conn, msg_len)
-
-        raw = recv_exact(conn, 2)
-        tag_len = int.from_bytes(raw, "big")
-        tag = recv_exact(conn, tag_len)
+        message, tag = recv_frames(conn, 2)
     except ConnectionError as e:
         print(f"[{time.strftime('%H:%M:%S')}] Connection aborted by {addr}: {e}")
         return
@@ -101,16 +171,13 @@ def handle_connection(conn, addr):
     if len(message) < 56:
         print(f"[{time.strftime('%H:%M:%S')}] Message too short ({len(message)} bytes) from {addr}")
         return
-
-    # Split message: payload + freshness timestamp
-    structured_payload = message[:-8]
-    freshness = message[-8:]
-    try:
-        ts = struct.unpack(">Q", freshness)[0]
-    except Exception:
-        print(f"[{time.strftime('%H:%M:%S')}] Failed to unpack freshness from {addr}")
+    if len(tag) != TAG_LEN:
+        print(f"[{time.strftime('%H:%M:%S')}] [FAILURE] Bad tag length ({len(tag)} bytes) from {addr}")
         return
 
+    # Message layout: payload (48B) + freshness timestamp (last 8B)
+    ts = FRESHNESS.unpack_from(message, len(message) - 8)[0]
+
     # --- Freshness check ---
     now = int(time.time())
     age = now - ts
@@ -121,24 +188,32 @@ def handle_connection(conn, addr):
         print(f"[{time.strftime('%H:%M:%S')}] !!!! Dropping future msg from {addr} (delta={ts - now}s)")
         return
 
+    bad_key = message + tag
+    if bad_key in BAD_TAG_SET:
+        print(f"[{time.strftime('%H:%M:%S')}] [FAILURE] HMAC mismatch from {addr} (known bad tag {tag.hex()})")
+        return
+
     # --- Verify HMAC ---
     try:
-        calc_full = hmac.new(SECRET_KEY, structured_payload + freshness, hashlib.sha256).digest()
-        calc_tag = calc_full[:tag_len]
+        mac = HMAC_BASE.copy()
+        mac.update(message)  # message == structured_payload + freshness
+        calc_full = mac.digest()
+        calc_tag = calc_full[:TAG_LEN]
     except Exception as e:
         print(f"[{time.strftime('%H:%M:%S')}] HMAC compute error: {e}")
         return
 
-    if calc_tag != tag:
+    if not hmac.compare_digest(calc_tag, tag):
+        record_bad_tag(bad_key)
         print(f"[{time.strftime('%H:%M:%S')}] [FAILURE] HMAC mismatch from {addr} (recv {tag.hex()} vs calc {calc_tag.hex()})")
         return
 
     # --- Replay detection ---
-    msg_hash = hashlib.sha256(structured_payload + freshness + tag).hexdigest()[:32]
-    if msg_hash in REPLAY_SET:
+    # The tag now equals calc_full[:TAG_LEN], so the full HMAC output already identifies message + tag; its
+    # untransmitted bytes 8..15 are the replay key (no second SHA-256 pass over the message).
+    if not record_replay(REPLAY_KEY.unpack_from(calc_full, TAG_LEN)[0]):
         print(f"[{time.strftime('%H:%M:%S')}] !!!! Replay detected from {addr}, dropping.")
         return
-    record_replay(msg_hash)
 
     # --- Simulate overload-based drops ---
     drop_prob, cpu = compute_drop_prob()
@@ -148,7 +223,7 @@ def handle_connection(conn, addr):
 
     # --- Unpack structured payload ---
     try:
-        fields = struct.unpack(PAYLOAD_FMT, structured_payload)
+        fields = PAYLOAD.unpack_from(message, 0)
         speed, rpm, temp, steer, fuel, brake, lat, lon = fields[:8]
     except Exception as e:
         print(f"[{time.strftime('%H:%M:%S')}] Unpack error from {addr}: {e}")
@@ -161,11 +236,16 @@ def main():
     print(f"SECOC (TCP) receiver listening on {HOST}:{PORT}")
     with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
         s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        # Linux: accept() normally waits for the client's first data; an idle handshake is only delayed (accepted
+        # after ~RECV_TIMEOUT plus a SYN-ACK retransmit), not dropped, and then times out in recv_frames as before
+        if hasattr(socket, "TCP_DEFER_ACCEPT"):
+            s.setsockopt(socket.IPPROTO_TCP, socket.TCP_DEFER_ACCEPT, int(RECV_TIMEOUT))
         s.bind((HOST, PORT))
         s.listen(MAX_CONN_QUEUE)
         try:
             while True:
                 conn, addr = s.accept()
+                conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)  # No Nagle/delayed-ACK stall on small frames
                 with conn:
                     print(f"[{time.strftime('%H:%M:%S')}] Connection from {addr}")
                     handle_connection(conn, addr)
@@ -17,25 +17,33 @@ import time
 import random
 import hmac
 import hashlib
+import os
 
 HOST = "127.0.0.1"
 PORT = 65432
 SECRET_KEY = b"my_shared_secret"
 PAYLOAD_FMT = ">H I h h B H ff 27x"  # 48 bytes structured
+PAYLOAD = struct.Struct(PAYLOAD_FMT)  # precompiled: format string parsed once
+FRESHNESS = struct.Struct(">Q")
 TAG_LEN = 8
+# Own generator for payload values (not the shared module-level one). Each process sends one payload, so a fixed
+# seed alone would repeat it every run and the receiver would drop the repeats as replays. SENDER_SEED (not the
+# receiver's EXPERIMENT_SEED) is mixed with a per-run value: SENDER_RUN (a counter set by the caller, giving a
+# reproducible sequence across runs) or the pid. Unset / 0 = OS entropy.
+SENDER_SEED = int(os.environ.get("SENDER_SEED", "0"))
+RNG = random.Random(f"{SENDER_SEED}:{os.environ.get('SENDER_RUN', os.getpid())}" if SENDER_SEED else None)
 
 def make_structured_payload():
-    speed = random.randint(0, 250)
-    rpm = random.randint(600, 8000)
-    temperature = random.randint(-40, 125)
-    steering_angle = random.randint(-540, 540)
-    fuel_level = random.randint(0, 100)
-    brake_pressure = random.randint(0, 200)
-    gps_lat = random.uniform(-90.0, 90.0)
-    gps_lon = random.uniform(-180.0, 180.0)
-    payload = struct.pack(PAYLOAD_FMT,
-                          speed, rpm, temperature, steering_angle,
-                          fuel_level, brake_pressure, gps_lat, gps_lon)
+    speed = RNG.randint(0, 250)
+    rpm = RNG.randint(600, 8000)
+    temperature = RNG.randint(-40, 125)
+    steering_angle = RNG.randint(-540, 540)
+    fuel_level = RNG.randint(0, 100)
+    brake_pressure = RNG.randint(0, 200)
+    gps_lat = RNG.uniform(-90.0, 90.0)
+    gps_lon = RNG.uniform(-180.0, 180.0)
+    payload = PAYLOAD.pack(speed, rpm, temperature, steering_angle,
+                           fuel_level, brake_pressure, gps_lat, gps_lon)
     fields = {
         "speed": speed, "rpm": rpm, "temp": temperature,
         "steer": steering_angle, "fuel": fuel_level, "brake": brake_pressure,
@@ -45,15 +53,21 @@ def make_structured_payload():
 
 def main():
     payload, fields = make_structured_payload()
-    freshness = struct.pack(">Q", int(time.time()))
+    freshness = FRESHNESS.pack(int(time.time()))
     message = payload + freshness  # 56 bytes
     full_tag = hmac.new(SECRET_KEY, message, hashlib.sha256).digest()
     tag = full_tag[:TAG_LEN]
 
     try:
         with socket.create_connection((HOST, PORT), timeout=5) as s:
-            s.sendall(len(message).to_bytes(2, "big") + message)
-            s.sendall(len(tag).to_bytes(2, "big") + tag)
+            s.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)  # msg and tag go out without waiting on Nagle
+            # One frame, one write: 2B msg_len | message | 2B tag_len | tag
+            frame = bytearray()
+            frame += len(message).to_bytes(2, "big")
+            frame += message
+            frame += len(tag).to_bytes(2, "big")
+            frame += tag
+            s.sendall(frame)
         print("Sent SECOC-TCP message")
         print(f" lengths -> msg:{len(message)} tag:{len(tag)}")
         print(" fields ->", fields)
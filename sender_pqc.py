@@ -2,6 +2,7 @@ import socket
 import time
 import struct
 import random
+import os
 import oqs
 
 HOST = '127.0.0.1'
@@ -11,24 +12,30 @@ PORT = 65433
 # Fields similar to CAN example:
 # speed(2), rpm(4), temp(2), steer(2), fuel(1), brake(2), lat(4f), lon(4f) + padding(27 bytes) to reach 48 bytes
 payload_fmt = ">H I h h B H ff 27x"
+payload_struct = struct.Struct(payload_fmt)  # precompiled format
+freshness_struct = struct.Struct(">Q")
+# own generator for the payload values. One payload per process, so SENDER_SEED is mixed with a per-run value
+# (SENDER_RUN counter from the caller -> reproducible sequence across runs; else the pid) instead of repeating it.
+# Unset / 0 = OS entropy. Independent of the receiver's EXPERIMENT_SEED.
+sender_seed = int(os.environ.get("SENDER_SEED", "0"))
+rng = random.Random(f"{sender_seed}:{os.environ.get('SENDER_RUN', os.getpid())}" if sender_seed else None)
 
-speed          = random.randint(0, 250)
-rpm            = random.randint(600, 8000)
-temperature    = random.randint(-40, 125)
-steering_angle = random.randint(-540, 540)
-fuel_level     = random.randint(0, 100)
-brake_pressure = random.randint(0, 200)
-gps_lat        = random.uniform(-90.0, 90.0)
-gps_lon        = random.uniform(-180.0, 180.0)
-
-structured_payload = struct.pack(
-    payload_fmt,
+speed          = rng.randint(0, 250)
+rpm            = rng.randint(600, 8000)
+temperature    = rng.randint(-40, 125)
+steering_angle = rng.randint(-540, 540)
+fuel_level     = rng.randint(0, 100)
+brake_pressure = rng.randint(0, 200)
+gps_lat        = rng.uniform(-90.0, 90.0)
+gps_lon        = rng.uniform(-180.0, 180.0)
+
+structured_payload = payload_struct.pack(
     speed, rpm, temperature, steering_angle, fuel_level, brake_pressure, gps_lat, gps_lon
 )
 assert len(structured_payload) == 48
 
 # ---------------- Freshness + Message Construction ----------------
-freshness = struct.pack(">Q", int(time.time()))  # 8-byte timestamp
+freshness = freshness_struct.pack(int(time.time()))  # 8-byte timestamp
 message = structured_payload + freshness         # total = 56 bytes
 
 # ---------------- Dilithium2 Signing ----------------
@@ -40,12 +47,15 @@ with oqs.Signature('Dilithium2') as signer:
 
     # ---------------- Send over TCP ----------------
     with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)  # send each frame immediately (no Nagle)
         s.connect((HOST, PORT))
 
-        # send message
-        s.sendall(len(message).to_bytes(2, 'big') + message)
-        s.sendall(len(signature).to_bytes(2, 'big') + signature)
-        s.sendall(len(public_key).to_bytes(2, 'big') + public_key)
+        # send message, signature and public key as one prebuilt frame: one write, usually one segment
+        frame = bytearray()
+        for part in (message, signature, public_key):
+            frame += len(part).to_bytes(2, 'big')
+            frame += part
+        s.sendall(frame)
 
         print("Sent signed structured message")
         print(f" lengths -> msg:{len(message)} sig:{len(signature)} pub:{len(public_key)}")